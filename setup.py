@@ -44,6 +44,8 @@ setup(
         "psutil",
         "nvidia-ml-py3",
         "prompt-toolkit",
+        "lxml",
+        "accelerate",
     ],
     entry_points={
         "console_scripts": ["nebula = nebula.nebula:main_func"],
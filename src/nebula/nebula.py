@@ -1,8 +1,10 @@
 import argparse
 import ast
+import atexit
 import gc
 import json
 import logging
+import mmap
 import os
 import random
 import re
@@ -10,10 +12,11 @@ import shlex
 import shutil
 import socket
 import subprocess
+import sys
 import threading
-import time
-import xml.etree.ElementTree as ET
+import zipfile
 from datetime import datetime
+from functools import lru_cache
 from importlib.metadata import version
 from importlib.resources import path as resource_path
 from typing import List, Optional, Tuple, Union
@@ -22,6 +25,7 @@ import psutil
 import pynvml
 import requests
 import torch
+from lxml import etree
 from prompt_toolkit import PromptSession, prompt
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.formatted_text import ANSI
@@ -154,9 +158,10 @@ MAX_RESULTS_DEFAULT = 1e6
 
 
 class ActionChoiceValidator(Validator):
+    VALID_CHOICES = frozenset({"yes", "y", "no", "n", "always", "a"})
+
     def validate(self, document):
-        text = document.text.lower().strip()
-        if text not in ["yes", "y", "no", "n", "always", "a"]:
+        if document.text.lower().strip() not in self.VALID_CHOICES:
             raise ValidationError(
                 message="Invalid choice. Please enter 'y', 'n', or 'a'."
             )
@@ -171,15 +176,6 @@ class FunctionValidator(Validator):
             raise ValidationError(message="Invalid input. Please try again.")
 
 
-class WordValidator(Validator):
-    def __init__(self, accepted_words):
-        self.accepted_words = accepted_words
-
-    def validate(self, document):
-        if document.text.lower() not in self.accepted_words:
-            raise ValidationError(message="Please enter a valid choice.")
-
-
 class InteractiveGenerator:
     # Define the IP pattern
     # This ip pattern is very generous and should change in the future
@@ -190,10 +186,67 @@ class InteractiveGenerator:
     FLAG_PATTERN = re.compile(
         r"(?<!\d{2}:\d{2}:\d{2})-\w+|(?<!\d{4}-\d{2}-\d{2})--[\w-]+"
     )  # Updated Regular expression
-    URL_PATTERN_VALIDATION = r"http[s]?://(?:[a-zA-Z]|[0-9]|[-._~:/?#[\]@!$&'()*+,;=]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+    # Matches the start of a colon separated segment that belongs to a URL, MAC, IPv4 or IPv6 address
+    ADDRESS_SEGMENT_PATTERN = re.compile(
+        r"\s?(https?://[^\s]*|(?:(?:[0-9a-fA-F]{2}:)+)|\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}|[0-9a-fA-F]{0,4}::[0-9a-fA-F]{0,4})"
+    )
+    TRAILING_DOT_PATTERN = re.compile(r"\.$")
+    URL_PATTERN_VALIDATION = re.compile(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[-._~:/?#[\]@!$&'()*+,;=]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+    )
+    # Looser URL pattern used to pull URLs out of free text
+    URL_PATTERN = re.compile(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+    )
+    # Everything in an nmap command before its -oX output flag
+    NMAP_XML_OUTPUT_PATTERN = re.compile(r"^(.*?)-oX")
+    # Whitespace separated words ending in .py
+    PYTHON_FILE_PATTERN = re.compile(r"(?<!\S)\S*\.py(?!\S)")
+    TRAILING_IP_PATTERN = re.compile(r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b\s*$")
     CVE_PATTERN = re.compile(
         r"CVE-\d{4}-\d{4,7}", re.IGNORECASE
     )  # Regular expression for CVE pattern
+    CVE_PATTERN_BYTES = re.compile(rb"CVE-\d{4}-\d{4,7}", re.IGNORECASE)
+    COLON_SPLIT_PATTERN = re.compile("(:)")
+    # A CVE id missing its dashes inside a filename, e.g. CVE2021123.py
+    CVE_FILENAME_PATTERN = re.compile(r"(CVE)\s*(\d{4})(\d+)(\..+)", re.IGNORECASE)
+    CVE_FILENAME_SUB_PATTERN = re.compile(r"CVE\s*\d{4}\d+", re.IGNORECASE)
+    # Splits a search result line at its first colon and flags service/CVE lines
+    RESULT_LINE_PATTERN = re.compile(
+        r"(?P<prefix>\s*(?:(?P<service>service)|(?P<cve>cve))?[^:]*)(?::(?P<suffix>.*))?",
+        re.IGNORECASE | re.DOTALL,
+    )
+    # Metasploit style placeholders such as {{ RHOSTS }} in suggested commands
+    PLACEHOLDER_PATTERN = re.compile(r"\{\{ (RHOSTS|RPORT|LHOST|LPORT) \}\}")
+    # Deletes forward and back slashes in a single pass
+    SLASH_TRANSLATION = str.maketrans("", "", "/\\")
+    # Compiled XPath expressions used to pull host details out of nmap XML
+    HOSTNAME_XPATH = etree.XPath("string(hostnames/hostname/@name)")
+    ADDRESS_XPATH = etree.XPath("string(address/@addr)")
+    OPEN_PORTS_XPATH = etree.XPath("ports/port[state/@state='open'][service]")
+    # Search results that can be executed without manual intervention
+    RUNNABLE_SUFFIXES = (".py", ".sh")
+    RUNNABLE_PREFIX = "nmap"
+    # prompt_toolkit styles shared by the interactive prompts
+    PROMPT_STYLE = Style.from_dict({"prompt": "white"})
+    ACTION_CHOICE_STYLE = Style.from_dict(
+        {"prompt": "white", "options": "green", "error": "red", "message": "blue"}
+    )
+    # Every star glyph pre-colored in each of the Nebula-themed colors
+    STAR_GLYPHS = {
+        glyph: tuple(
+            colored(glyph, color) for color in ("cyan", "magenta", "yellow", "blue")
+        )
+        for glyph in "*."
+    }
+    # Service names from nmap that nebula reports under a different name
+    SERVICE_ALIASES = {"domain": "dns"}
+    EXPLOIT_PROMPT = ANSI(
+        colored(
+            "\nEnter the modified content or press enter to keep it unchanged: ",
+            "white",
+        )
+    )
 
     def __init__(self, results_dir=None, model_dir=None, testing_mode=None):
         self.args = self._parse_arguments()
@@ -207,16 +260,38 @@ class InteractiveGenerator:
         self.docker_hub_api_url = (
             f"https://hub.docker.com/v2/repositories/{self.image_name}/tags/"
         )
+        self._run_as_package = None
+        self._path_cache = {}
         self.index_dir = self.return_path("indexdir")
+        self._ix_cache = {}
+        self._query_parser = None
+        self._searcher_cache = {}
         self.s3_url = self._determine_s3_url()
         self._ensure_model_folder_exists()
         self._validate_model_dirs()
         self.command_running = False
+        self._command_done = threading.Event()
+        self._command_done.set()
+        self._dir_cache = {}
+        self._nvml_handle = None
+        self._local_ip = None
+        self._command_history = InMemoryHistory()
+        self._action_validator = ActionChoiceValidator()
         self._ensure_results_directory_exists()
         self.max_truncate_length: int = 500
         self.single_model_mode = False
         self.tokenizers = {}
         self.models = {}
+        self.device = torch.device(
+            "cuda" if torch.cuda.is_available() else "cpu"
+        )  # Set the device once
+        # Half precision halves the weight bytes read per token on the GPU
+        if self.device.type == "cuda":
+            self.model_dtype = (
+                torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            )
+        else:
+            self.model_dtype = torch.float32
         self.print_star_sky()
         self.show_nebula_pro()
         self.log_file_path = None
@@ -231,6 +306,7 @@ class InteractiveGenerator:
         self.always_apply_action: bool = False
         self.words_to_exclude = []
         self.load_exclusions()
+        self._spell_checker = None
         self.suggestions = self.get_suggestions()
         if self.is_run_as_package():
             self.check_new_pypi_version()  # Check for newer PyPI package
@@ -314,7 +390,9 @@ class InteractiveGenerator:
 
     def _extract_python_files(self, text):
         """Extract .py files from the given text."""
-        return [word for word in text.split() if word.endswith(".py")]
+        if ".py" not in text:
+            return []
+        return self.PYTHON_FILE_PATTERN.findall(text)
 
     def load_exclusions(self):
         try:
@@ -339,6 +417,23 @@ class InteractiveGenerator:
                 f"An unexpected error occurred: {e}. Continuing with default settings."
             )
 
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _analyze_python_source(file, mtime_ns):
+        """Parse a Python file and return what InputAnalyzer found in it.
+
+        The modification time is part of the cache key so edited files are parsed again.
+        """
+        with open(file, "r") as f:
+            tree = ast.parse(f.read())
+        analyzer = InputAnalyzer()
+        analyzer.visit(tree)
+        return (
+            bool(analyzer.detected_cli_libs),
+            bool(analyzer.detected_input_libs),
+            tuple(analyzer.options.items()),
+        )
+
     def _analyze_and_modify_python_file(self, file):
         """Analyze a Python file and prompt the user for input options."""
         if not os.path.exists(file):
@@ -346,42 +441,42 @@ class InteractiveGenerator:
             return None
 
         try:
-            with open(file, "r") as f:
-                content = f.read()
-                tree = ast.parse(content)
-                analyzer = InputAnalyzer()
-                analyzer.visit(tree)
+            (
+                has_cli_libs,
+                has_input_libs,
+                detected_options,
+            ) = self._analyze_python_source(file, os.stat(file).st_mtime_ns)
 
-                if not analyzer.detected_cli_libs:
-                    cprint(
-                        f"{file} does not use recognized input libraries, please run it manually.",
-                        "red",
-                    )
-                    return None
-                if analyzer.detected_input_libs:
-                    cprint(
-                        f"{file} has direct user prompt embedded in it and cannot be ran automatically, please run it manually.",
-                        "red",
-                    )
-                    return None
-                options = []
+            if not has_cli_libs:
+                cprint(
+                    f"{file} does not use recognized input libraries, please run it manually.",
+                    "red",
+                )
+                return None
+            if has_input_libs:
                 cprint(
-                    "IMPORTANT: I will attempt to guide you through the process of using this exploit...",
-                    "green",
+                    f"{file} has direct user prompt embedded in it and cannot be ran automatically, please run it manually.",
+                    "red",
                 )
-                for option, description in analyzer.options.items():
-                    prompt_text = f"Enter value for {option}"
-                    if description:
-                        prompt_text += f" ({description})"
-                    prompt_text += " (or 'q' to stop): "
-                    cprint(prompt_text, "yellow", end="")
-                    value = input()
-                    if value == "q":
-                        cprint("Operation aborted by user.", "red")
-                        return None
-                    options.extend([option, value])
-
-                return options
+                return None
+            options = []
+            cprint(
+                "IMPORTANT: I will attempt to guide you through the process of using this exploit...",
+                "green",
+            )
+            for option, description in detected_options:
+                prompt_text = f"Enter value for {option}"
+                if description:
+                    prompt_text += f" ({description})"
+                prompt_text += " (or 'q' to stop): "
+                cprint(prompt_text, "yellow", end="")
+                value = input()
+                if value == "q":
+                    cprint("Operation aborted by user.", "red")
+                    return None
+                options.extend([option, value])
+
+            return options
 
         except (FileNotFoundError, SyntaxError) as e:
             cprint(
@@ -389,6 +484,22 @@ class InteractiveGenerator:
             )
             return None
 
+    def _collect_python_file_options(self, python_files):
+        """Prompt for the options of each python file.
+
+        Returns a list of (file, options) pairs, or None as soon as one file cannot be prepared.
+        """
+        analyze = self._analyze_and_modify_python_file
+        file_options = []
+        for file in python_files:
+            options = analyze(file)
+            if not options:
+                # If no options are returned, log an appropriate message and exit.
+                cprint(f"Could not determine options for the file {file}.", "yellow")
+                return None
+            file_options.append((file, options))
+        return file_options
+
     def split(self, data):
         return data.split(": ", 1)
 
@@ -504,7 +615,7 @@ class InteractiveGenerator:
             cprint(f"Running command: {command}", "yellow")
             if not self.args.testing_mode:
                 self.run_command_and_alert(command, timestamp)
-            match = re.search(r"^(.*?)-oX", command)
+            match = self.NMAP_XML_OUTPUT_PATTERN.search(command)
             if match:
                 command = match.group(1)
             command_history.append(command)
@@ -584,34 +695,35 @@ class InteractiveGenerator:
         return action
 
     def print_farewell_message(self, width=30, height=10, density=0.5):
-        # Calculate the position to print the farewell message
-        farewell_msg = "Until our stars align again!!"
-        start_x = (width - len(farewell_msg)) // 2
+        self._print_star_field("Until our stars align again!!", width, height, density)
+
+    @staticmethod
+    def _print_star_field(message, width, height, density):
+        """Print a field of randomly colored stars with the message in the middle row."""
+        # Calculate the position to print the message
+        start_x = (width - len(message)) // 2
         start_y = height // 2
 
-        star_colors = [
-            "cyan",
-            "magenta",
-            "yellow",
-            "blue",
-        ]  # Nebula-themed colors for stars
+        stars = InteractiveGenerator.STAR_GLYPHS
+        colored_message = [colored(char, "white", attrs=["bold"]) for char in message]
 
+        rows = []
         for y in range(height):
+            row = []
             for x in range(width):
-                # Check if we are at the position to print the farewell message
-                if y == start_y and start_x <= x < start_x + len(farewell_msg):
-                    print(
-                        colored(farewell_msg[x - start_x], "white", attrs=["bold"]),
-                        end="",
-                    )
+                # Check if we are at the position to print the message
+                if y == start_y and start_x <= x < start_x + len(message):
+                    row.append(colored_message[x - start_x])
                     continue
 
                 if random.random() < density:
                     chosen_star = "*" if random.random() < 0.5 else "."
-                    print(colored(chosen_star, random.choice(star_colors)), end="")
+                    row.append(random.choice(stars[chosen_star]))
                 else:
-                    print(" ", end="")
-            print()  # Move to the next line after each row
+                    row.append(" ")
+            rows.append("".join(row))
+        # Write the whole field at once
+        print("\n".join(rows))
 
     def show_nebula_pro(self):
         # Define your message components
@@ -635,34 +747,7 @@ class InteractiveGenerator:
         print(twitter_info)
 
     def print_star_sky(self, width=30, height=10, density=0.5):
-        # Calculate the position to print the welcome message
-        welcome_msg = "Welcome to Nebula"
-        start_x = (width - len(welcome_msg)) // 2
-        start_y = height // 2
-
-        star_colors = [
-            "cyan",
-            "magenta",
-            "yellow",
-            "blue",
-        ]  # Nebula-themed colors for stars
-
-        for y in range(height):
-            for x in range(width):
-                # Check if we are at the position to print the welcome message
-                if y == start_y and start_x <= x < start_x + len(welcome_msg):
-                    print(
-                        colored(welcome_msg[x - start_x], "white", attrs=["bold"]),
-                        end="",
-                    )
-                    continue
-
-                if random.random() < density:
-                    chosen_star = "*" if random.random() < 0.5 else "."
-                    print(colored(chosen_star, random.choice(star_colors)), end="")
-                else:
-                    print(" ", end="")
-            print()  # Move to the next line after each row
+        self._print_star_field("Welcome to Nebula", width, height, density)
 
     def _load_flag_descriptions(self, file_path, selected_model_name):
         """Load flag descriptions from a file and return them as a dictionary."""
@@ -670,11 +755,10 @@ class InteractiveGenerator:
             if file_path is None:
                 raise ValueError("file_path cannot be None")
             with open(file_path, "r") as f:
-                lines = f.readlines()
                 # Store the entire line as the value in the dictionary using flag as key
                 return {
-                    line.split(":")[0].strip(): line.strip()
-                    for line in lines
+                    line.partition(":")[0].strip(): line.strip()
+                    for line in f
                     if ":" in line
                 }
         except Exception as e:
@@ -770,11 +854,16 @@ class InteractiveGenerator:
             cprint(f"You are running the latest version ({current_version}).", "greens")
 
     def return_path(self, path):
+        cached = self._path_cache.get(path)
+        if cached is not None:
+            return cached
         if self.is_run_as_package():
             with resource_path("nebula", path) as correct_path:
-                return str(correct_path)
+                resolved = str(correct_path)
         else:
-            return path
+            resolved = path
+        self._path_cache[path] = resolved
+        return resolved
 
     @staticmethod
     def _determine_s3_url():
@@ -866,32 +955,41 @@ class InteractiveGenerator:
                 self._ensure_model_folder_exists()
 
     def _ensure_results_directory_exists(self):
-        if not os.path.exists(self.args.results_dir):
-            os.makedirs(self.args.results_dir)
+        os.makedirs(self.args.results_dir, exist_ok=True)
 
     def is_run_as_package(self):
-        # Check if the script is within a 'site-packages' directory
-        if os.environ.get("IN_DOCKER"):
-            self.check_for_update()
-            return False
-        return "site-packages" in os.path.abspath(__file__)
+        # The answer cannot change while running, so work it out (and check
+        # for docker updates) only once
+        if self._run_as_package is None:
+            # Check if the script is within a 'site-packages' directory
+            if os.environ.get("IN_DOCKER"):
+                self.check_for_update()
+                self._run_as_package = False
+            else:
+                self._run_as_package = "site-packages" in os.path.abspath(__file__)
+        return self._run_as_package
 
     def folder_exists_and_not_empty(self, folder_path):
         # Check if the folder exists
         if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
             return False
-        # Check if the folder is empty
-        if not os.listdir(folder_path):
-            return False
-        return True
+        # Check if the folder is empty, stopping at the first entry
+        with os.scandir(folder_path) as entries:
+            return next(entries, None) is not None
 
     def download_and_unzip(self, url, output_name):
         try:
-            # Download the file from the S3 bucket using wget with progress bar
+            # Stream the file from the S3 bucket to disk with a progress bar
             print("Downloading...")
-            subprocess.run(
-                ["wget", "--progress=bar:force:noscroll", url, "-O", output_name]
-            )
+            with requests.get(url, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                total = int(response.headers.get("content-length", 0))
+                with open(output_name, "wb") as f, tqdm(
+                    total=total, unit="B", unit_scale=True, unit_divisor=1024
+                ) as pbar:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                        pbar.update(len(chunk))
 
             # Create the target directory if it doesn't exist
             target_dir = os.path.splitext(output_name)[0]
@@ -899,17 +997,22 @@ class InteractiveGenerator:
 
             # Unzip the downloaded file to the target directory
             print("\nUnzipping...")
-            subprocess.run(["unzip", output_name, "-d", target_dir])
-
-            os.remove(output_name)
-        except subprocess.CalledProcessError as e:
+            with zipfile.ZipFile(output_name) as archive:
+                archive.extractall(target_dir)
+        except (requests.RequestException, zipfile.BadZipFile) as e:
             cprint(f"Error occurred: {e}", "red")
             logging.error(f"Error occurred: {e}")
         except Exception as e:
             cprint(f"Unexpected error: {e}", "red")
             logging.error(f"Unexpected error: {e}")
-
-    def run_command_and_alert(self, text: str, timestamp=None) -> None:
+        finally:
+            # Never leave a partial or corrupt archive behind
+            if os.path.exists(output_name):
+                os.remove(output_name)
+
+    def run_command_and_alert(
+        self, text: Union[str, List[str]], timestamp=None
+    ) -> None:
         if timestamp is None:
             timestamp = (
                 datetime.now().strftime("%I:%M:%S-%p-%Y-%m-%d").replace(" ", "-")
@@ -922,6 +1025,7 @@ class InteractiveGenerator:
         def execute_command(command: Union[str, List[str]]) -> Tuple[int, str, str]:
             """
             Executes the provided command and returns the returncode, stdout, and stderr.
+            Strings are run through the shell, argument lists are executed directly.
             """
             try:
                 process = subprocess.Popen(
@@ -929,7 +1033,7 @@ class InteractiveGenerator:
                     stdin=subprocess.PIPE,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    shell=True,
+                    shell=isinstance(command, str),
                     text=True,
                 )
                 stdout, stderr = process.communicate()
@@ -955,7 +1059,7 @@ class InteractiveGenerator:
             command_str = text
 
         # Execute the command
-        returncode, stdout, stderr = execute_command(command_str)
+        returncode, stdout, stderr = execute_command(text)
         truncated_cmd = command_str[:10].replace(" ", "_") + (
             "..." if len(command_str) > 15 else ""
         )
@@ -967,7 +1071,7 @@ class InteractiveGenerator:
             f"result_{file_name}.txt",
         )
         try:
-            ET.ElementTree(ET.fromstring(stdout))
+            etree.fromstring(stdout.encode())
             cprint("XML format detected, nothing to do", "green")
             return
         except Exception:
@@ -1007,25 +1111,26 @@ class InteractiveGenerator:
                 logging.debug(f"An error occurred: {e}", "red")
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def ensure_space_between_letter_and_number(s: str) -> str:
         try:
             if not isinstance(s, str):
                 raise ValueError("The input must be a string.")
 
             segments = s.split(":")
+            address_match = InteractiveGenerator.ADDRESS_SEGMENT_PATTERN.match
 
             for i, segment in enumerate(segments[:-1]):
                 # If current segment ends with http or looks like a URL or IP prefix
-                if segment.strip().endswith(("http", "https")) or re.match(
-                    r"\s?(https?://[^\s]*|(?:(?:[0-9a-fA-F]{2}:)+)|\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}|[0-9a-fA-F]{0,4}::[0-9a-fA-F]{0,4})",
-                    segment,
+                if segment.strip().endswith(("http", "https")) or address_match(
+                    segment
                 ):
                     continue
                 else:
                     s = ":".join(segments[i + 1 :])
                     break
 
-            s = re.sub(r"\.$", "", s)
+            s = InteractiveGenerator.TRAILING_DOT_PATTERN.sub("", s)
 
             return s.strip()
 
@@ -1059,6 +1164,48 @@ class InteractiveGenerator:
             "{base_file_location}", self.args.exploit_db_base_location.rstrip("/")
         )
 
+    def get_local_ip(self) -> str:
+        """Get local machine IP, looked up once per session once a lookup succeeds"""
+        if self._local_ip is not None:
+            return self._local_ip
+        try:
+            # This creates a new socket and connects to an external server's port.
+            # We use Google's public DNS server for this example, but no data is actually sent.
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+            s.close()
+        except Exception:
+            # Default to loopback, without caching it so the next call retries
+            return "127.0.0.1"
+        self._local_ip = ip
+        return ip
+
+    @staticmethod
+    def _replace_matches(pattern, s: str, replacements: List[str]) -> str:
+        """Replace the n-th match of pattern with the n-th replacement in a single pass.
+
+        A value that occurs more than once keeps the replacement of its first occurrence.
+        """
+        if not replacements:
+            return s
+        seen = {}
+        match_index = 0
+
+        def substitute(match):
+            nonlocal match_index
+            value = match.group(0)
+            if value not in seen:
+                seen[value] = (
+                    replacements[match_index]
+                    if match_index < len(replacements)
+                    else value
+                )
+            match_index += 1
+            return seen[value]
+
+        return pattern.sub(substitute, s)
+
     def process_string(
         self,
         s: str = "",
@@ -1081,19 +1228,6 @@ class InteractiveGenerator:
             replacement_urls = []
         """Replace the IP addresses and URLs in the given string with the respective replacements."""
 
-        def get_local_ip() -> str:
-            """Get local machine IP"""
-            try:
-                # This creates a new socket and connects to an external server's port.
-                # We use Google's public DNS server for this example, but no data is actually sent.
-                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                s.connect(("8.8.8.8", 80))
-                ip = s.getsockname()[0]
-                s.close()
-                return ip
-            except Exception:
-                return "127.0.0.1"  # default to loopback, if unable to determine IP
-
         def get_random_port(above: int = 1024, max_retries: int = 100) -> int:
             """Get random port above the specified number that's not in use."""
             for _ in range(max_retries):
@@ -1119,14 +1253,10 @@ class InteractiveGenerator:
                 replacement_ips = [replacement_ips]
 
             for ip in replacement_ips:
-                if not re.match(self.IP_PATTERN, ip):
+                if not self.IP_PATTERN.match(ip):
                     raise ValueError(f"One of the replacement IPs ({ip}) is not valid.")
 
-            ip_addresses = re.findall(self.IP_PATTERN, s)
-            if ip_addresses:
-                for i, ip in enumerate(ip_addresses):
-                    if i < len(replacement_ips):
-                        s = s.replace(ip, replacement_ips[i])
+            s = self._replace_matches(self.IP_PATTERN, s, replacement_ips)
         except Exception as e:
             logging.error(f"Error in IP processing: {e}")
 
@@ -1136,31 +1266,40 @@ class InteractiveGenerator:
                 replacement_urls = [replacement_urls]
 
             for url in replacement_urls:
-                if not re.match(self.URL_PATTERN_VALIDATION, url):
+                if not self.URL_PATTERN_VALIDATION.match(url):
                     raise ValueError(
                         f"One of the replacement URLs ({url}) is not valid."
                     )
 
-            urls = self.extract_urls(s)
-            for i, url in enumerate(urls):
-                if i < len(replacement_urls):
-                    s = s.replace(url, replacement_urls[i])
+            s = self._replace_matches(self.URL_PATTERN, s, replacement_urls)
         except Exception as e:
             logging.error(f"Error in URL processing: {url}{e}")
 
-        # Replace placeholders
-        if replacement_ips and len(replacement_ips) > 0:
+        # Replace placeholders in one pass, resolving each value only if it is used
+        if replacement_ips and len(replacement_ips) > 0 and "{{" in s:
             primary_ip = replacement_ips[0]
-            s = s.replace("{{ RHOSTS }}", primary_ip)
+            placeholder_factories = {
+                "RHOSTS": lambda: primary_ip,
+                "LHOST": lambda: (
+                    self.get_local_ip()
+                    if not self.args.lan_or_wan_ip
+                    else self.args.lan_or_wan_ip
+                ),
+                "LPORT": lambda: str(get_random_port()),
+            }
             if port_arg:
-                s = s.replace("{{ RPORT }}", str(port_arg))
-            s = s.replace(
-                "{{ LHOST }}",
-                get_local_ip()
-                if not self.args.lan_or_wan_ip
-                else self.args.lan_or_wan_ip,
-            )
-            s = s.replace("{{ LPORT }}", str(get_random_port()))
+                placeholder_factories["RPORT"] = lambda: str(port_arg)
+            placeholder_values = {}
+
+            def replace_placeholder(match):
+                name = match.group(1)
+                if name not in placeholder_factories:
+                    return match.group(0)
+                if name not in placeholder_values:
+                    placeholder_values[name] = placeholder_factories[name]()
+                return placeholder_values[name]
+
+            s = self.PLACEHOLDER_PATTERN.sub(replace_placeholder, s)
         timestamp = datetime.now().strftime("%I:%M:%S-%p-%Y-%m-%d").replace(" ", "-")
         if s.strip().startswith("nmap"):
             output_xml = f"{self.args.results_dir}/nmap_output_{timestamp}.xml"
@@ -1168,7 +1307,7 @@ class InteractiveGenerator:
             s += f" -oX {output_xml} -oN {output_txt}"
 
         if s.strip().startswith("nuclei"):
-            s = re.sub(r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b\s*$", "", s).strip()
+            s = self.TRAILING_IP_PATTERN.sub("", s).strip()
         if "{base_file_location}" in s:
             s = self.replace_base_location(s)
         return s
@@ -1182,8 +1321,7 @@ class InteractiveGenerator:
         Returns:
             list: List of URLs found in the string.
         """
-        url_pattern = r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
-        return re.findall(url_pattern, s)
+        return self.URL_PATTERN.findall(s)
 
     def generate_text(self, prompt_text: str, max_length: int = 1024) -> str:
         """
@@ -1207,7 +1345,7 @@ class InteractiveGenerator:
                 return_tensors="pt",
                 add_special_tokens=True,
                 max_length=max_length,
-                pad_to_max_length=False,
+                padding=False,
                 return_attention_mask=True,
                 truncation=False,
             )
@@ -1217,7 +1355,8 @@ class InteractiveGenerator:
             temp = 0.1
             if self.current_model == "scribe":
                 temp = 0.5
-            with tqdm(total=max_length, desc="Generating text", position=0) as pbar:
+            cprint("Generating text...", "white")
+            with torch.inference_mode():
                 output = self.current_model.generate(
                     input_ids=input_ids,
                     attention_mask=attention_mask,
@@ -1228,8 +1367,9 @@ class InteractiveGenerator:
                     top_p=0.95,
                     temperature=temp,
                     repetition_penalty=1.0,
+                    use_cache=True,
+                    pad_token_id=self.current_tokenizer.eos_token_id,
                 )
-                pbar.update(len(output[0]))
 
             generated_text = self.current_tokenizer.decode(
                 output[0], skip_special_tokens=True
@@ -1284,6 +1424,27 @@ class InteractiveGenerator:
                         f"Error during interactive session with prompt '{prompt[:30]}...': {e}"
                     )
 
+    def _list_result_files(self, file_extension=None) -> list:
+        """
+        Return the sorted filenames in the results directory, optionally filtered by extension.
+        The listing is cached and only rebuilt when the directory's mtime changes.
+        """
+        results_dir = self.args.results_dir
+        mtime = os.stat(results_dir).st_mtime_ns
+        cache_key = (results_dir, file_extension)
+        cached = self._dir_cache.get(cache_key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with os.scandir(results_dir) as entries:
+            filenames = sorted(
+                entry.name
+                for entry in entries
+                if not file_extension or entry.name.endswith(file_extension)
+            )
+        self._dir_cache[cache_key] = (mtime, filenames)
+        return filenames
+
     def display_command_list(self, file_extension=None) -> None:
         """
         Display a list of previously saved result filenames truncated to self.max_truncate_length.
@@ -1291,15 +1452,7 @@ class InteractiveGenerator:
         cprint("\nPrevious Results:", "cyan")
 
         # Fetching filenames from the results directory
-        all_files = os.listdir(self.args.results_dir)
-
-        # If a file extension is specified, filter the files by that extension
-        if file_extension:
-            filenames = sorted(
-                [file for file in all_files if file.endswith(file_extension)]
-            )
-        else:
-            filenames = sorted(all_files)
+        filenames = self._list_result_files(file_extension)
         if not filenames:
             cprint("no results found", "red")
             return
@@ -1334,8 +1487,7 @@ class InteractiveGenerator:
 
                     if action == "w":
                         cprint("Waiting for the command to complete...", "yellow")
-                        while self.command_running:
-                            time.sleep(1)
+                        self._command_done.wait()
                         cprint(
                             "Command completed!, you can view the result using the 'view previous results' option on the main menu",
                             "green",
@@ -1484,9 +1636,6 @@ class InteractiveGenerator:
     def _load_tokenizer_and_model(self, model_name: Optional[str] = None):
         # Clear current models and tokenizers if a specific model is to be loaded
         first_loaded = None
-        self.device = torch.device(
-            "cuda" if torch.cuda.is_available() else "cpu"
-        )  # Set the device once
 
         # List all available model directories or just the specified one
         model_folders = [model_name] if model_name else os.listdir(self.args.model_dir)
@@ -1517,9 +1666,15 @@ class InteractiveGenerator:
                         end="",
                         flush=True,
                     )
-                    self.current_model = GPT2LMHeadModel.from_pretrained(full_path)
+                    # Weights are loaded straight onto the target device without
+                    # first materializing a randomly initialized copy on the CPU
+                    self.current_model = GPT2LMHeadModel.from_pretrained(
+                        full_path,
+                        torch_dtype=self.model_dtype,
+                        low_cpu_mem_usage=True,
+                        device_map={"": self.device},
+                    )
                     self.current_model.eval()
-                    self.current_model.to(self.device)
                     cprint(" Done!", "cyan")
 
                     # Add the successfully loaded model and tokenizer to their respective dictionaries
@@ -1560,9 +1715,7 @@ class InteractiveGenerator:
             logging.error(f"An error occurred while fetching CPU memory info: {e}")
 
         try:
-            pynvml.nvmlInit()
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            info = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            info = self._get_gpu_memory_info()
             cprint(f"Used GPU memory: {info.used / (1024**2):.2f} MB", "white")
 
         except Exception as e:
@@ -1571,15 +1724,25 @@ class InteractiveGenerator:
 
         return first_loaded
 
+    def _get_gpu_memory_info(self):
+        """Return the NVML memory info of the first GPU, initializing NVML only once."""
+        if self._nvml_handle is None:
+            pynvml.nvmlInit()
+            atexit.register(pynvml.nvmlShutdown)
+            self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        return pynvml.nvmlDeviceGetMemoryInfo(self._nvml_handle)
+
     def _input_command_without_model_selection(self) -> str:
         """Internal method to get a command input from the user without model selection."""
 
         # Styling definitions
         style = Style.from_dict({"prompt": "white", "error": "red", "message": "white"})
 
-        # Initialize the spell checker
-        spell = SpellChecker()
-        spell.word_frequency.load_words(self.words_to_exclude)
+        # Initialize the spell checker once, loading its dictionary is expensive
+        if self._spell_checker is None:
+            self._spell_checker = SpellChecker()
+            self._spell_checker.word_frequency.load_words(self.words_to_exclude)
+        spell = self._spell_checker
         while True:  # Keep prompting until valid input or 'q' is entered
             # Get the actual user input for the model to generate
             user_input = prompt(
@@ -1600,23 +1763,18 @@ class InteractiveGenerator:
             # Split the user input into words
             words = user_input.split()
 
+            # Only purely alphabetic words can be spell checked; skip numbers,
+            # words containing digits, URLs and punctuation-heavy tokens
+            candidates = [word for word in words if word.isalpha()]
+
+            # Look up all candidates in the dictionary at once; the spell checker
+            # returns the unknown words lowercased
+            misspelled = spell.unknown(candidates)
+
             # Correct words that are not in the dictionary
             corrections_made = False  # Flag to check if any corrections were accepted
             for index, word in enumerate(words):
-                # Check if the word is a number or contains digits; if yes, then continue to the next iteration
-                if word.isdigit() or any(char.isdigit() for char in word):
-                    continue
-
-                # Check if word is a URL; if yes, continue to the next iteration
-                if re.match(
-                    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
-                    word,
-                ):
-                    continue
-
-                # If the word is not in the dictionary
-                misspelled = spell.unknown([word])
-                if misspelled:
+                if word.lower() in misspelled:
                     # Get the most likely correct spelling for the word
                     suggestion = spell.correction(word)
 
@@ -1624,17 +1782,23 @@ class InteractiveGenerator:
                     if not suggestion:
                         continue
 
-                    # Display the suggestion to the user and ask for their choice
-                    try:
-                        choice = prompt(
-                            f"Did you mean '{suggestion}' instead of '{word}'? (Y/n): ",
-                            style=style,
-                            validator=WordValidator(["y", "n", ""]),
-                            validate_while_typing=False,
-                        ).lower()
-                    except Exception as e:
-                        cprint(f"Error occurred: {e}", "red")
-                        logging.error(f"Error occurred: {e}")
+                    # Display the suggestion to the user and ask for their choice. A plain
+                    # stdin read is enough for a single y/n answer
+                    while True:
+                        sys.stdout.write(
+                            f"Did you mean '{suggestion}' instead of '{word}'? (Y/n): "
+                        )
+                        sys.stdout.flush()
+                        line = sys.stdin.readline()
+                        # At EOF or on a closed stdin readline returns a line without
+                        # a newline, which must not count as accepting the suggestion
+                        if not line.endswith("\n"):
+                            choice = "n"
+                            break
+                        choice = line.strip().lower()
+                        if choice in ("y", "n", ""):
+                            break
+                        cprint("Please enter a valid choice.", "red")
 
                     # If the user accepts the suggestion, replace the word in the list
                     if choice == "y" or choice == "":
@@ -1652,92 +1816,85 @@ class InteractiveGenerator:
 
             return corrected_input
 
+    def _get_index(self, indexdir: str):
+        """Open the Whoosh index in indexdir once and reuse it on later calls."""
+        ix = self._ix_cache.get(indexdir)
+        if ix is None:
+            ix = open_dir(indexdir)
+            self._ix_cache[indexdir] = ix
+            if self._query_parser is None:
+                self._query_parser = MultifieldParser(
+                    ["content"], schema=ix.schema, group=OrGroup
+                )
+        return ix
+
+    def _get_searcher(self, indexdir: str):
+        """Return a searcher for indexdir, only reopening it when the index has changed."""
+        searcher = self._searcher_cache.get(indexdir)
+        if searcher is None:
+            searcher = self._get_index(indexdir).searcher()
+        else:
+            searcher = searcher.refresh()
+        self._searcher_cache[indexdir] = searcher
+        return searcher
+
+    @staticmethod
+    def _matching_lines(results, term, max_results):
+        """Collect the result lines that mention term before their colon."""
+        matches = []
+        for res in results:
+            lines = res["content"].splitlines()
+            for line in lines:
+                if ":" in line:
+                    # Get the part before the colon
+                    before_colon = line.partition(":")[0]
+                    if term in before_colon.lower():
+                        matches.append(line.strip())
+                        # Stop reading further hits once the term has enough lines
+                        if len(matches) >= max_results:
+                            return matches
+        return matches
+
     def search_index(
         self, query_list: Union[list, str], indexdir: str, max_results: int = 10
     ) -> list:
         try:
-            ix = open_dir(indexdir)
+            searcher = self._get_searcher(indexdir)
         except Exception as e:
             logging.error(f"Error occurred while opening index directory: {e}")
             return []
 
-        results_dict = {}
-        searched_items = set()
-
         if isinstance(query_list, str):
             query_list = [{"services": [query_list]}]
 
-        with ix.searcher() as searcher:
-            # Multifield Search
-            query_parser = MultifieldParser(
-                ["content"], schema=ix.schema, group=OrGroup
-            )
-
-            for query in query_list:
-                cves = query.get("cves", [])
-                service_names = query.get("services", [])
-
-                # Search for CVEs first if they exist
-                for cve in cves:
-                    if cve.lower() in searched_items:
-                        continue
-
-                    searched_items.add(cve.lower())
-                    parsed_query = query_parser.parse(cve.lower())
-                    cve_results = []
-
-                    try:
-                        results = searcher.search(parsed_query, limit=max_results)
-                        for res in results:
-                            content = res["content"]
-                            lines = content.splitlines()
-                            for line in lines:
-                                if ":" in line:
-                                    # Get the part before the colon
-                                    before_colon = line.split(":")[0]
-                                    if cve.lower() in before_colon.lower():
-                                        cve_results.append(line.strip())
-                                        if len(cve_results) >= max_results:
-                                            break
-
-                        if cve_results:
-                            results_dict[cve] = cve_results
-
-                    except Exception as e:
-                        logging.error(
-                            f"Error occurred while searching for CVE {cve}: {e}"
-                        )
+        # Collect every CVE and service up front, keyed by the lowercased term,
+        # so that each one is only looked up once per call
+        result_keys = {}
+        for query in query_list:
+            for key_prefix, terms in (
+                ("", query.get("cves", [])),
+                ("Service ", query.get("services", [])),
+            ):
+                for term in terms:
+                    result_keys.setdefault(term.lower(), f"{key_prefix}{term}")
 
-                # If services are specified, search for them
-                for s in service_names:
-                    if s.lower() in searched_items:
-                        continue
+        if not result_keys:
+            return []
 
-                    searched_items.add(s.lower())
-                    parsed_query = query_parser.parse(s.lower())
-                    service_results = []
+        # Each term gets its own ranked search so that terms whose documents
+        # score low are not crowded out by the others
+        query_parser = self._query_parser
+        results_dict = {}
+        for term, key in result_keys.items():
+            try:
+                parsed_query = query_parser.parse(term)
+                results = searcher.search(parsed_query, limit=max_results)
+                matches = self._matching_lines(results, term, max_results)
+                if matches:
+                    results_dict[key] = matches
 
-                    try:
-                        results = searcher.search(parsed_query, limit=max_results)
-                        for res in results:
-                            content = res["content"]
-                            lines = content.splitlines()
-                            for line in lines:
-                                if ":" in line:
-                                    # Get the part before the colon
-                                    before_colon = line.split(":")[0]
-                                    if s.lower() in before_colon.lower():
-                                        service_results.append(line.strip())
-                                        if len(service_results) >= max_results:
-                                            break
-
-                        if service_results:
-                            results_dict[f"Service {s}"] = service_results
-
-                    except Exception as e:
-                        logging.error(
-                            f"Error occurred while searching for service {s}: {e}"
-                        )
+            except Exception as e:
+                logging.error(f"Error occurred while searching for {key}: {e}")
 
         formatted_results = []
         for key, values in results_dict.items():
@@ -1746,111 +1903,107 @@ class InteractiveGenerator:
 
         return formatted_results
 
-    def _parse_nmap_xml(self, xml_file):
-        if os.path.isfile(xml_file):
-            tree = ET.parse(xml_file)
-        else:
-            tree = ET.ElementTree(ET.fromstring(xml_file))
-        root = tree.getroot()
-
-        parsed_results = []
-        cve_matches = set()  # Use a set to avoid duplicate CVEs
-
-        # Extract CVEs from the entire XML once
-        for elem in root.iter():  # Search within the entire XML tree
-            # Check element tag for CVE
-            tag_cves = self.CVE_PATTERN.findall(elem.tag)
-            cve_matches.update(tag_cves)
+    def _parse_nmap_host(self, host) -> dict:
+        """Extract the hostname, address and open ports/services of a host element."""
+        device_name = self.HOSTNAME_XPATH(host) or "Unknown"
+        ip_address = self.ADDRESS_XPATH(host) or "Unknown"
 
-            # Check element text for CVE
-            if elem.text:
-                text_cves = self.CVE_PATTERN.findall(elem.text)
-                cve_matches.update(text_cves)
+        ports = []
+        services = []
+        seen_ports = set()
 
-            # Check all attributes for CVEs
-            for attrib_name, attrib_value in elem.attrib.items():
-                attrib_name_cves = self.CVE_PATTERN.findall(attrib_name)
-                cve_matches.update(attrib_name_cves)
+        for port in self.OPEN_PORTS_XPATH(host):
+            port_id = port.get("portid")
+            if port_id in seen_ports:
+                continue
 
-                attrib_value_cves = self.CVE_PATTERN.findall(attrib_value)
-                cve_matches.update(attrib_value_cves)
+            seen_ports.add(port_id)
+            ports.append(port_id)
+            service_name = port.find("service").get("name")
+            services.append(self.SERVICE_ALIASES.get(service_name, service_name))
 
-        for attrib_value_cve in cve_matches:
-            cprint(f"CVE(s) found: {attrib_value_cve}", "red")
-        for host in root.findall("host"):
-            try:
-                device_name = host.find("hostnames/hostname").attrib.get(
-                    "name", "Unknown"
-                )
-            except AttributeError:
-                device_name = "Unknown"
+        return {
+            "hostname": device_name,
+            "ip": ip_address,
+            "ports": ports,
+            "services": services,
+        }
 
-            try:
-                ip_address = host.find("address").attrib.get("addr", "Unknown")
-            except AttributeError:
-                ip_address = "Unknown"
+    def _parse_nmap_xml(self, xml_file):
+        parsed_results = []
 
-            ports = []
-            services = []
+        if os.path.isfile(xml_file):
+            # Extract CVEs straight from the raw file instead of walking a DOM
+            with open(xml_file, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mm:
+                cve_matches = {
+                    match.decode("ascii")
+                    for match in self.CVE_PATTERN_BYTES.findall(mm)
+                }
 
-            for port in host.findall("ports/port"):
-                try:
-                    port_id = port.attrib.get("portid")
-                    port_state = port.find("state").attrib.get("state")
-                    service_name = port.find("service").attrib.get("name")
-
-                    if port_state == "open" and port_id not in ports:
-                        ports.append(port_id)
-                        if service_name == "domain":
-                            services.append("dns")
-                        else:
-                            services.append(service_name)
-                except AttributeError:
-                    continue
+            # Stream the hosts, releasing each element once it has been processed
+            add_result = parsed_results.append
+            parse_host = self._parse_nmap_host
+            for _, elem in etree.iterparse(xml_file, events=("end",), tag="host"):
+                add_result(parse_host(elem))
+                elem.clear()
+                # Drop the already processed hosts from the root as well
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        else:
+            root = etree.fromstring(xml_file.encode())
+            cve_matches = set(self.CVE_PATTERN.findall(xml_file))
+            parsed_results = [
+                self._parse_nmap_host(host) for host in root.findall("host")
+            ]
 
-            parsed_results.append(
-                {
-                    "hostname": device_name,
-                    "ip": ip_address,
-                    "ports": ports,
-                    "services": services,
-                    "cves": list(
-                        cve_matches
-                    ),  # Convert the set to a list before adding
-                }
-            )
+        for attrib_value_cve in cve_matches:
+            cprint(f"CVE(s) found: {attrib_value_cve}", "red")
+        # Every host shares the same CVEs, so hand out one immutable tuple
+        cve_tuple = tuple(cve_matches)
+        for host_result in parsed_results:
+            host_result["cves"] = cve_tuple
         timestamp = datetime.now().strftime("%I:%M:%S-%p-%Y-%m-%d").replace(" ", "-")
         cve_file_name = f"{self.args.results_dir}/CVEs-{timestamp}.txt"
         with open(cve_file_name, "w") as file:
-            if isinstance(cve_matches, list):
-                for match in cve_matches:
-                    file.write(str(match) + "\n")
-            else:
-                file.write(str(cve_matches))
+            # One CVE per line, written in a single call
+            file.write("".join(f"{match}\n" for match in cve_tuple))
         return parsed_results
 
-    def correct_cve_filename(self, filepath):
+    @staticmethod
+    def is_directly_runnable(command):
+        """Return True if the command is a script or an nmap invocation."""
+        return command.endswith(
+            InteractiveGenerator.RUNNABLE_SUFFIXES
+        ) or command.startswith(InteractiveGenerator.RUNNABLE_PREFIX)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def correct_cve_filename(filepath):
         # This regular expression is looking for the CVE pattern anywhere in the string
-        match = re.search(r"(CVE)\s*(\d{4})(\d+)(\..+)", filepath, re.IGNORECASE)
+        match = InteractiveGenerator.CVE_FILENAME_PATTERN.search(filepath)
         if match:
             # Reformat the CVE with the correct structure
             corrected_cve = (
                 f"{match.group(1).upper()}-{match.group(2)}-{match.group(3)}"
             )
             # Replace the incorrect CVE part with the corrected one
-            corrected_filepath = re.sub(
-                r"CVE\s*\d{4}\d+", corrected_cve, filepath, flags=re.IGNORECASE
+            corrected_filepath = InteractiveGenerator.CVE_FILENAME_SUB_PATTERN.sub(
+                corrected_cve, filepath
             )
             return corrected_filepath
         else:
             # If the filepath does not contain a CVE pattern, return it as is
             return filepath
 
-    def colored_output(self, text):
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def colored_output(text):
         """Color everything before the first ':' in red and the rest in yellow."""
 
         # Split the text at the first ':'
-        parts = re.split("(:)", text, maxsplit=1)
+        parts = InteractiveGenerator.COLON_SPLIT_PATTERN.split(text, maxsplit=1)
 
         # Color everything before the first ':' in red
         if len(parts) > 1:
@@ -1931,14 +2084,7 @@ class InteractiveGenerator:
         cmd_num = int(cmd)
 
         # Fetching filenames from the results directory based on the optional file extension filter
-        all_files = os.listdir(self.args.results_dir)
-
-        if file_extension:
-            filenames = sorted(
-                [file for file in all_files if file.endswith(file_extension)]
-            )
-        else:
-            filenames = sorted(all_files)
+        filenames = self._list_result_files(file_extension)
 
         # Ensure the selected cmd_num is within range
         if 1 <= cmd_num <= len(filenames):
@@ -2006,25 +2152,22 @@ class InteractiveGenerator:
                 idx += 1
                 continue
 
-            is_service = line.strip().lower().startswith("service")
-            is_cve = (
-                line.strip().lower().startswith("cve")
-                and ":" in line
-                and line.split(":", 1)[1].strip()
-            )
+            # Classify the line and split it at the first colon in a single pass
+            match = self.RESULT_LINE_PATTERN.match(line)
+            prefix, suffix = match.group("prefix"), match.group("suffix")
 
             if line.endswith(":"):
                 print(colored(line, "yellow"))
-            elif is_service:
+            elif match.group("service"):
                 print(colored(line, "yellow"))  # Retain the yellow color for services
-            elif is_cve:
-                prefix, suffix = line.split(":", 1)  # Split the CVE line at the colon
+            elif match.group("cve") and suffix and suffix.strip():
                 print(
                     colored(f"{idx}. {prefix}:", "red") + colored(f" {suffix}", "blue")
                 )
                 idx += 1
             else:
-                prefix, suffix = line.split(":", 1) if ":" in line else (line, "")
+                if suffix is None:
+                    suffix = ""
                 print(
                     colored(f"{idx}. {prefix}:", "white")
                     + colored(f" {suffix}", "green")
@@ -2069,9 +2212,7 @@ class InteractiveGenerator:
                         content_after_colon = selected_result
                 else:
                     content_after_colon = selected_result
-                if not content_after_colon.endswith(
-                    (".py", ".sh")
-                ) and not content_after_colon.startswith("nmap"):
+                if not self.is_directly_runnable(content_after_colon):
                     cprint(
                         "Exploit cannot be run directly, please copy the file path and run it manually",
                         "red",
@@ -2129,29 +2270,19 @@ class InteractiveGenerator:
         """Internal method to display previous results and loop back to the main prompt."""
 
         # Fetch filenames from the results directory
-        all_files = os.listdir(self.args.results_dir)
-
-        # If a file extension is specified, filter the files by that extension
-        if file_extension:
-            filenames = sorted(
-                [file for file in all_files if file.endswith(file_extension)]
-            )
-        else:
-            filenames = sorted(all_files)
+        filenames = self._list_result_files(file_extension)
 
         # Check if there are no previous results
         if not filenames:
             cprint("No previous results available.", "red")
             return True  # Return to the main loop
 
-        style = Style.from_dict({"prompt": "white"})
-
         while True:  # Keep looping until user decides to go back
             self.display_command_list(file_extension)
 
             cmd = prompt(
                 "Enter the number of the result you'd like to view (or type 'back' or 'b' to return): ",
-                style=style,
+                style=self.PROMPT_STYLE,
             )
 
             if cmd.lower().strip() in ["back", "b"]:
@@ -2218,29 +2349,35 @@ class InteractiveGenerator:
             return False  # This returns the original prompt as a fallback. Adjust as needed.
 
     def remove_slashes(self, input_str: str) -> str:
-        return input_str.replace("/", "").replace("\\", "")
+        return input_str.translate(self.SLASH_TRANSLATION)
 
-    def run_command(self, text: str) -> None:
+    def run_command(self, text: Union[str, List[str]]) -> None:
         """
         A function to run a command in the background based on the generated text.
         """
+        command_str = " ".join(text) if isinstance(text, list) else text
 
         def threaded_function():
-            self.run_command_and_alert(text)
-            self.command_running = (
-                False  # Set the flag to False once the command is done executing.
-            )
+            try:
+                self.run_command_and_alert(text)
+            except Exception as e:
+                logging.error(f"Error while running command {command_str}: {e}")
+            finally:
+                self.command_running = (
+                    False  # Set the flag to False once the command is done executing.
+                )
+                self._command_done.set()  # Wake up anyone waiting on the command
 
         # Before starting the thread, set the command_running flag to True.
+        # Every command gets its own thread so that long scans never
+        # queue behind each other
         self.command_running = True
-        time.sleep(
-            0.1
-        )  # Introduce a short delay to give main thread some breathing room
+        self._command_done.clear()
         thread = threading.Thread(target=threaded_function)
         thread.start()
 
         # Inform user that command has started
-        cprint(f"\nThe operation has been initiated, running {text}", "green")
+        cprint(f"\nThe operation has been initiated, running {command_str}", "green")
 
         return
 
@@ -2368,9 +2505,7 @@ class InteractiveGenerator:
         )
 
         # Check if the line is not a Python or shell script and does not start with "nmap".
-        if not content_after_colon.endswith(
-            (".py", ".sh")
-        ) and not content_after_colon.startswith("nmap"):
+        if not self.is_directly_runnable(content_after_colon):
             cprint(
                 "Exploit cannot be run directly, please copy the file path and run it manually",
                 "red",
@@ -2378,22 +2513,14 @@ class InteractiveGenerator:
             return
 
         # Extract python files from the content, if any.
-        python_files = self._extract_python_files(
-            self.process_string(content_after_colon)
-        )
+        processed_content = self.process_string(content_after_colon)
+        python_files = self._extract_python_files(processed_content)
 
         # Prompt the user to modify the content or keep it unchanged.
         modified_content = prompt(
-            ANSI(
-                colored(
-                    "\nEnter the modified content or press enter to keep it unchanged: ",
-                    "white",
-                )
-            ),
-            default=self.process_string(
-                "python3 " + content_after_colon
-                if python_files
-                else content_after_colon
+            self.EXPLOIT_PROMPT,
+            default=(
+                f"python3 {processed_content}" if python_files else processed_content
             ),
         )
 
@@ -2403,18 +2530,11 @@ class InteractiveGenerator:
 
         # If there are python files, analyze and run each with potential options.
         if python_files:
-            for file in python_files:
-                options = self._analyze_and_modify_python_file(file)
-                if options:
-                    cmd = ["python3"] + [file] + options
-                    self.run_command(" ".join(cmd))
-
-                else:
-                    # If no options are returned, log an appropriate message and exit.
-                    cprint(
-                        f"Could not determine options for the file {file}.", "yellow"
-                    )
-                    return
+            file_options = self._collect_python_file_options(python_files)
+            if file_options is None:
+                return
+            for file, options in file_options:
+                self.run_command(["python3", file, *options])
         else:
             # If no python files, run the content directly.
             self.run_command(content_after_colon)
@@ -2423,57 +2543,31 @@ class InteractiveGenerator:
         """Format the service name properly."""
 
         # Split the line into hostname and service
-        parts = line.split(":", 1)
-        if len(parts) != 2:
+        hostname, separator, service = line.partition(":")
+        if not separator:
             return line  # Return the original line if it doesn't contain a service name
 
-        hostname, service = parts
-
         # Format the service name based on the desired format.
         # Example: If the service name is "domain", replace it with "dns"
-        if service == "domain":
-            service = "dns"
+        service = self.SERVICE_ALIASES.get(service, service)
 
         # Combine the formatted service name with the hostname
         return f"{hostname}:{service}"
 
     def get_modified_command(self, text: str) -> str:
         """Prompt the user to modify and return a command."""
-        history = InMemoryHistory()
-        style = Style.from_dict(
-            {
-                "prompt": "white",
-            }
-        )
+        cprint(
+            "\nThe current command is: ", "cyan", end=""
+        )  # 'end=""' prevents new line
+        cprint(text, "white")  # Change "yellow" to whatever color you prefer for 'text'
 
         try:
-            cprint(
-                "\nThe current command is: ", "cyan", end=""
-            )  # 'end=""' prevents new line
-            cprint(
-                text, "white"
-            )  # Change "yellow" to whatever color you prefer for 'text'
-
             modified_text = prompt(
                 "\nModify the command as needed and press Enter: ",
                 default=text,
-                history=history,
-                style=style,
+                history=self._command_history,
+                style=self.PROMPT_STYLE,
             )
-
-            python_files = self._extract_python_files(modified_text)
-            if python_files:
-                for file in python_files:
-                    options = self._analyze_and_modify_python_file(file)
-                    if options:
-                        modified_text += " " + " ".join(options)
-                        cprint(f"{modified_text}", "red")
-                    else:
-                        return None
-                return modified_text.strip()
-            else:
-                return modified_text.strip()
-
         except Exception as e:
             logging.error(f"Error during modified command prompt: {e}")
             cprint(
@@ -2482,6 +2576,18 @@ class InteractiveGenerator:
             )
             return text  # Return the original text as a fallback
 
+        python_files = self._extract_python_files(modified_text)
+        if python_files:
+            file_options = self._collect_python_file_options(python_files)
+            if file_options is None:
+                return None
+            command_parts = [modified_text]
+            for _, options in file_options:
+                command_parts.extend(options)
+            modified_text = " ".join(command_parts)
+            cprint(f"{modified_text}", "red")
+        return modified_text.strip()
+
     def handle_generated_text(self, text):
         """Handle the generated text based on user's choice or predefined actions.
 
@@ -2498,7 +2604,8 @@ class InteractiveGenerator:
                 return
 
             # Ask the user for their action choice
-            if text.strip().endswith(".txt") and not text.strip().startswith("nmap"):
+            stripped_text = text.strip()
+            if stripped_text.endswith(".txt") and not stripped_text.startswith("nmap"):
                 return
             else:
                 action_choice = self.get_action_choice()
@@ -2521,10 +2628,6 @@ class InteractiveGenerator:
             )
 
     def get_action_choice(self) -> str:
-        style = Style.from_dict(
-            {"prompt": "white", "options": "green", "error": "red", "message": "blue"}
-        )
-
         if self.current_model_name != "scribe":
             action_choice_prompt = (
                 "Do you want to run a command based on the generated text?"
@@ -2535,8 +2638,8 @@ class InteractiveGenerator:
                 try:
                     action_choice = prompt(
                         f"{action_choice_prompt} {options}",
-                        style=style,
-                        validator=ActionChoiceValidator(),
+                        style=self.ACTION_CHOICE_STYLE,
+                        validator=self._action_validator,
                         validate_while_typing=False,
                     )
                     return action_choice.lower().strip()